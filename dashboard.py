@@ -20,6 +20,17 @@ import warnings
 import os
 from dotenv import load_dotenv
 import google.generativeai as genai
+from optimizacion_respuestas import (
+    PLANTILLA_OSCURA, compactar_figura, configurar_serializacion, configurar_compresion
+)
+from trayectorias import (
+    almacen_disponible, listar_puntos, obtener_trayectoria, mapa_calor_cancha,
+    ANCHO_CANCHA, LARGO_CANCHA
+)
+from explicaciones_shap import explicaciones_disponibles, factores_principales
+from pronosticos import (
+    actualizar_pronosticos, calcular_distancia_cluster, METRICAS_PRONOSTICO, NIVEL_INTERVALO
+)
 
 warnings.filterwarnings('ignore')
 
@@ -137,6 +148,25 @@ except FileNotFoundError as e:
     jugadores_lista = []
     datos_cargados = False
 
+# Trayectorias por frame (opcional, generadas por el notebook)
+trayectorias_disponibles = almacen_disponible()
+if not trayectorias_disponibles:
+    print("⚠️ No se encontró el almacén 'trayectorias/'. Mapa de calor y trayectorias deshabilitados.")
+
+# Pronósticos por jugador (solo se recalculan los jugadores con partidos nuevos)
+pronosticos_por_jugador = {}
+if datos_cargados:
+    matches['distancia_cluster_alto'] = calcular_distancia_cluster(matches)
+    pronosticos = actualizar_pronosticos(matches)
+    pronosticos_por_jugador = {
+        jugador: grupo for jugador, grupo in pronosticos.groupby('player_name_clean')
+    }
+
+# Explicaciones SHAP precalculadas del modelo de estado físico (opcional)
+shap_disponible = explicaciones_disponibles()
+if not shap_disponible:
+    print("⚠️ No se encontró 'explicaciones_shap/'. Factores SHAP deshabilitados.")
+
 # =============================================================================
 # CONFIGURACIÓN DEL DASHBOARD
 # =============================================================================
@@ -144,6 +174,10 @@ except FileNotFoundError as e:
 app = Dash(__name__, external_stylesheets=[dbc.themes.DARKLY])
 app.title = "Dashboard Pádel Analytics"
 
+# Respuestas compactas: orjson + compresión brotli/gzip
+configurar_serializacion()
+configurar_compresion(app.server)
+
 # CSS personalizado para el dropdown
 app.index_string = '''
 <!DOCTYPE html>
@@ -369,6 +403,15 @@ else:
                     dbc.CardHeader("📈 Evolución del Rendimiento", 
                                   style={'backgroundColor': COLORS['primary']}),
                     dbc.CardBody([
+                        dcc.RadioItems(
+                            id='selector-metrica-pronostico',
+                            options=[{'label': f" {nombre}", 'value': metrica}
+                                     for metrica, nombre in METRICAS_PRONOSTICO.items()],
+                            value=next(iter(METRICAS_PRONOSTICO)),
+                            inline=True,
+                            inputStyle={'marginRight': '5px'},
+                            labelStyle={'marginRight': '15px'}
+                        ),
                         dcc.Graph(id='grafico-evolucion')
                     ])
                 ], style={'backgroundColor': COLORS['card']})
@@ -397,6 +440,54 @@ else:
             ], width=6)
         ], className="mb-4"),
         
+        # Factores SHAP del estado físico predicho
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader("🔍 Factores del Estado Físico Predicho (SHAP)", 
+                                  style={'backgroundColor': COLORS['primary']}),
+                    dbc.CardBody([
+                        html.P(id='shap-clase-predicha', className="lead"),
+                        dcc.Graph(id='grafico-shap')
+                    ])
+                ], style={'backgroundColor': COLORS['card']})
+            ])
+        ], className="mb-4") if shap_disponible else html.Div(),
+        
+        # Posición en cancha (mapa de calor y trayectoria por punto)
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader("🗺️ Mapa de Calor en Cancha", 
+                                  style={'backgroundColor': COLORS['primary']}),
+                    dbc.CardBody([
+                        dcc.Dropdown(
+                            id='selector-partido',
+                            placeholder="Todos los partidos",
+                            style={'backgroundColor': '#2a2a4a', 'color': '#ffffff'},
+                            className='dropdown-white-text mb-2'
+                        ),
+                        dcc.Graph(id='grafico-mapa-calor')
+                    ])
+                ], style={'backgroundColor': COLORS['card']})
+            ], width=6),
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader("🏃 Trayectoria por Punto", 
+                                  style={'backgroundColor': COLORS['primary']}),
+                    dbc.CardBody([
+                        dcc.Dropdown(
+                            id='selector-punto',
+                            placeholder="Selecciona un partido y un punto...",
+                            style={'backgroundColor': '#2a2a4a', 'color': '#ffffff'},
+                            className='dropdown-white-text mb-2'
+                        ),
+                        dcc.Graph(id='grafico-trayectoria')
+                    ])
+                ], style={'backgroundColor': COLORS['card']})
+            ], width=6)
+        ], className="mb-4") if trayectorias_disponibles else html.Div(),
+        
         # Información del perfil
         dbc.Row([
             dbc.Col([
@@ -454,7 +545,6 @@ if datos_cargados:
          Output('kpi-partidos', 'children'),
          Output('recomendacion-texto', 'children'),
          Output('grafico-umap', 'figure'),
-         Output('grafico-evolucion', 'figure'),
          Output('grafico-metricas', 'figure'),
          Output('grafico-radar', 'figure'),
          Output('perfil-jugador', 'children'),
@@ -464,14 +554,14 @@ if datos_cargados:
     )
     def actualizar_dashboard(jugador_seleccionado):
         if not jugador_seleccionado:
-            return ["Selecciona un jugador"] + ["--"] * 4 + [""] + [go.Figure()] * 5 + ["", "", go.Figure()]
+            return ["Selecciona un jugador"] + ["--"] * 4 + [""] + [go.Figure()] * 3 + ["", "", go.Figure()]
         
         # Filtrar datos del jugador
         datos_jugador = matches[matches['player_name_clean'] == jugador_seleccionado].copy()
         datos_jugador = datos_jugador.sort_values('partido_num')
         
         if len(datos_jugador) == 0:
-            return ["Sin datos"] + ["--"] * 4 + [""] + [go.Figure()] * 5 + ["", "", go.Figure()]
+            return ["Sin datos"] + ["--"] * 4 + [""] + [go.Figure()] * 3 + ["", "", go.Figure()]
         
         # KPIs
         nivel_rendimiento = datos_jugador['nivel_rendimiento'].iloc[-1] if 'nivel_rendimiento' in datos_jugador.columns else "N/A"
@@ -527,7 +617,7 @@ if datos_cargados:
             ))
         
         fig_umap.update_layout(
-            template='plotly_dark',
+            template=PLANTILLA_OSCURA,
             paper_bgcolor='rgba(0,0,0,0)',
             plot_bgcolor='rgba(0,0,0,0)',
             xaxis_title="UMAP 1",
@@ -536,32 +626,6 @@ if datos_cargados:
             legend=dict(x=0, y=1)
         )
         
-        # ===================== GRÁFICO EVOLUCIÓN =====================
-        fig_evolucion = go.Figure()
-        
-        if 'nivel_num' in datos_jugador.columns:
-            fig_evolucion.add_trace(go.Scatter(
-                x=datos_jugador['partido_num'],
-                y=datos_jugador['nivel_num'],
-                mode='lines+markers',
-                line=dict(color=COLORS['accent'], width=3),
-                marker=dict(size=12, symbol='circle'),
-                name='Rendimiento'
-            ))
-        
-        fig_evolucion.update_layout(
-            template='plotly_dark',
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)',
-            xaxis_title="Número de Partido",
-            yaxis_title="Nivel de Rendimiento",
-            yaxis=dict(
-                tickmode='array',
-                tickvals=[0, 1, 2],
-                ticktext=['Alto', 'Bajo', 'Medio']
-            )
-        )
-        
         # ===================== GRÁFICO MÉTRICAS =====================
         metricas_cols = [c for c in datos_jugador.columns if any(x in c for x in ['speed', 'acceleration', 'displacement', 'distance']) and datos_jugador[c].dtype in ['float64', 'int64']]
         metricas_mostrar = metricas_cols[:5]  # Máximo 5 métricas
@@ -580,7 +644,7 @@ if datos_cargados:
             fig_metricas = go.Figure()
         
         fig_metricas.update_layout(
-            template='plotly_dark',
+            template=PLANTILLA_OSCURA,
             paper_bgcolor='rgba(0,0,0,0)',
             plot_bgcolor='rgba(0,0,0,0)',
             xaxis_title="Métrica",
@@ -616,7 +680,7 @@ if datos_cargados:
             ))
         
         fig_radar.update_layout(
-            template='plotly_dark',
+            template=PLANTILLA_OSCURA,
             paper_bgcolor='rgba(0,0,0,0)',
             polar=dict(bgcolor='rgba(0,0,0,0)')
         )
@@ -677,7 +741,7 @@ if datos_cargados:
             fig_dist = go.Figure()
         
         fig_dist.update_layout(
-            template='plotly_dark',
+            template=PLANTILLA_OSCURA,
             paper_bgcolor='rgba(0,0,0,0)'
         )
         
@@ -691,10 +755,246 @@ if datos_cargados:
         kpi_evaluacion = html.Span(evaluacion, style={'color': color_eval})
         kpi_partidos = html.Span(str(num_partidos), style={'color': COLORS['accent']})
         
+        # Figuras compactas (float32; solo las coordenadas UMAP se redondean)
+        compactar_figura(fig_umap, coordenadas=True)
+        for fig in (fig_metricas, fig_radar, fig_dist):
+            compactar_figura(fig)
+        
         return (resumen, kpi_rendimiento, kpi_estado, kpi_evaluacion, kpi_partidos,
-                recomendacion, fig_umap, fig_evolucion, fig_metricas, fig_radar,
+                recomendacion, fig_umap, fig_metricas, fig_radar,
                 perfil, historial, fig_dist)
     
+    @callback(
+        Output('grafico-evolucion', 'figure'),
+        [Input('selector-jugador', 'value'),
+         Input('selector-metrica-pronostico', 'value')]
+    )
+    def actualizar_evolucion(jugador_seleccionado, metrica):
+        fig_evolucion = go.Figure()
+        if not jugador_seleccionado:
+            return fig_evolucion
+        
+        datos_jugador = matches[matches['player_name_clean'] == jugador_seleccionado]
+        datos_jugador = datos_jugador.sort_values('partido_num')
+        
+        # Eje X categórico en el orden de partidos del jugador: los partido_num son
+        # identificadores globales, así que los pronósticos se rotulan +1, +2, ...
+        etiquetas = [f"Partido {p}" for p in datos_jugador['partido_num']]
+        
+        if 'nivel_num' in datos_jugador.columns:
+            fig_evolucion.add_trace(go.Scatter(
+                x=etiquetas,
+                y=datos_jugador['nivel_num'],
+                mode='lines+markers',
+                line=dict(color=COLORS['accent'], width=3),
+                marker=dict(size=12, symbol='circle'),
+                name='Rendimiento'
+            ))
+        
+        # Pronóstico precalculado (sin ajustes en la petición)
+        pronostico = pronosticos_por_jugador.get(jugador_seleccionado)
+        nombre_metrica = METRICAS_PRONOSTICO[metrica]
+        if pronostico is not None:
+            pronostico = pronostico[pronostico['metrica'] == metrica].sort_values('paso')
+            pasos = [f"+{k}" for k in pronostico['paso']]
+            
+            fig_evolucion.add_trace(go.Scatter(
+                x=etiquetas,
+                y=datos_jugador[metrica],
+                mode='lines+markers',
+                line=dict(color=COLORS['success'], width=2),
+                name=nombre_metrica,
+                yaxis='y2'
+            ))
+            
+            # Banda del intervalo: superior y luego inferior rellenando hasta la anterior
+            fig_evolucion.add_trace(go.Scatter(
+                x=pasos,
+                y=pronostico['superior'],
+                mode='lines',
+                line=dict(width=0),
+                showlegend=False,
+                hoverinfo='skip',
+                yaxis='y2'
+            ))
+            fig_evolucion.add_trace(go.Scatter(
+                x=pasos,
+                y=pronostico['inferior'],
+                mode='lines',
+                line=dict(width=0),
+                fill='tonexty',
+                fillcolor='rgba(78, 204, 163, 0.2)',
+                name=f"Intervalo {NIVEL_INTERVALO:.0%}",
+                hoverinfo='skip',
+                yaxis='y2'
+            ))
+            
+            # Línea de pronóstico unida al último partido observado
+            fig_evolucion.add_trace(go.Scatter(
+                x=etiquetas[-1:] + pasos,
+                y=[datos_jugador[metrica].iloc[-1]] + pronostico['pronostico'].tolist(),
+                mode='lines+markers',
+                line=dict(color=COLORS['success'], width=2, dash='dash'),
+                marker=dict(size=8, symbol='diamond'),
+                name='Pronóstico',
+                yaxis='y2'
+            ))
+        
+        fig_evolucion.update_layout(
+            template=PLANTILLA_OSCURA,
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)',
+            xaxis=dict(title="Partido (pronóstico: partidos siguientes)", type='category'),
+            yaxis_title="Nivel de Rendimiento",
+            yaxis=dict(
+                tickmode='array',
+                tickvals=[0, 1, 2],
+                ticktext=['Alto', 'Bajo', 'Medio']
+            ),
+            yaxis2=dict(
+                title=nombre_metrica,
+                overlaying='y',
+                side='right',
+                showgrid=False
+            ),
+            legend=dict(orientation='h', y=-0.2)
+        )
+        
+        return compactar_figura(fig_evolucion)
+    
+    if shap_disponible:
+        @callback(
+            [Output('shap-clase-predicha', 'children'),
+             Output('grafico-shap', 'figure')],
+            [Input('selector-jugador', 'value')]
+        )
+        def actualizar_shap(jugador_seleccionado):
+            if not jugador_seleccionado:
+                return "", go.Figure()
+            
+            # Último partido del jugador (igual que los KPIs)
+            datos_jugador = matches[matches['player_name_clean'] == jugador_seleccionado]
+            if len(datos_jugador) == 0:
+                return "Sin datos", go.Figure()
+            partido_num = datos_jugador['partido_num'].max()
+            
+            clase, factores = factores_principales(jugador_seleccionado, partido_num)
+            if clase is None:
+                return f"Sin explicación SHAP para el partido {partido_num}", go.Figure()
+            
+            factores = factores.iloc[::-1]  # mayor impacto arriba
+            fig_shap = go.Figure(go.Bar(
+                x=factores['shap'],
+                y=[v.replace('num__', '').replace('cat__', '') for v in factores['variable']],
+                orientation='h',
+                marker_color=np.where(factores['shap'] > 0, COLORS['success'], COLORS['danger'])
+            ))
+            fig_shap.update_layout(
+                template=PLANTILLA_OSCURA,
+                paper_bgcolor='rgba(0,0,0,0)',
+                plot_bgcolor='rgba(0,0,0,0)',
+                xaxis_title=f"Contribución SHAP hacia '{clase}'",
+                margin=dict(l=250)
+            )
+            
+            texto = f"Estado físico predicho (partido {partido_num}): {clase}"
+            return texto, compactar_figura(fig_shap)
+    
+    if trayectorias_disponibles:
+        @callback(
+            [Output('selector-partido', 'options'),
+             Output('selector-partido', 'value')],
+            [Input('selector-jugador', 'value')]
+        )
+        def actualizar_partidos(jugador_seleccionado):
+            if not jugador_seleccionado:
+                return [], None
+            
+            partidos = sorted(matches.loc[matches['player_name_clean'] == jugador_seleccionado,
+                                          'partido_num'].unique())
+            return [{'label': f"Partido {p}", 'value': int(p)} for p in partidos], None
+        
+        @callback(
+            [Output('grafico-mapa-calor', 'figure'),
+             Output('selector-punto', 'options'),
+             Output('selector-punto', 'value')],
+            [Input('selector-jugador', 'value'),
+             Input('selector-partido', 'value')]
+        )
+        def actualizar_mapa_calor(jugador_seleccionado, partido_num):
+            if not jugador_seleccionado:
+                return go.Figure(), [], None
+            
+            # Histograma 2D en caché por jugador/partido
+            conteos, bordes_x, bordes_y = mapa_calor_cancha(jugador_seleccionado, partido_num)
+            
+            fig_calor = go.Figure(go.Heatmap(
+                z=conteos,
+                x=(bordes_x[:-1] + bordes_x[1:]) / 2,
+                y=(bordes_y[:-1] + bordes_y[1:]) / 2,
+                colorscale='Inferno',
+                colorbar=dict(title="Frames"),
+                hovertemplate="x: %{x:.1f} m<br>y: %{y:.1f} m<br>Frames: %{z}<extra></extra>"
+            ))
+            fig_calor.add_hline(y=LARGO_CANCHA / 2, line=dict(color='white', width=2))
+            fig_calor.update_layout(
+                template=PLANTILLA_OSCURA,
+                paper_bgcolor='rgba(0,0,0,0)',
+                plot_bgcolor='rgba(0,0,0,0)',
+                xaxis=dict(title="Ancho (m)", range=[0, ANCHO_CANCHA]),
+                yaxis=dict(title="Largo (m)", range=[0, LARGO_CANCHA], scaleanchor='x'),
+                height=500
+            )
+            
+            if partido_num is None:
+                return compactar_figura(fig_calor, coordenadas=True), [], None
+            
+            puntos = listar_puntos(jugador_seleccionado, partido_num)
+            opciones = [{'label': f"Punto {p}", 'value': p} for p in puntos]
+            return compactar_figura(fig_calor, coordenadas=True), opciones, (puntos[0] if puntos else None)
+        
+        @callback(
+            Output('grafico-trayectoria', 'figure'),
+            [Input('selector-jugador', 'value'),
+             Input('selector-partido', 'value'),
+             Input('selector-punto', 'value')]
+        )
+        def actualizar_trayectoria(jugador_seleccionado, partido_num, punto):
+            fig_trayectoria = go.Figure()
+            
+            if jugador_seleccionado and partido_num is not None and punto is not None:
+                # Solo se leen del disco los frames de este punto
+                trayectoria = obtener_trayectoria(jugador_seleccionado, partido_num, punto)
+                
+                fig_trayectoria.add_trace(go.Scatter(
+                    x=trayectoria['ball_position_x'],
+                    y=trayectoria['ball_position_y'],
+                    mode='markers',
+                    marker=dict(size=5, color=COLORS['warning'], opacity=0.5),
+                    name='Pelota'
+                ))
+                fig_trayectoria.add_trace(go.Scatter(
+                    x=trayectoria['player_position_x'],
+                    y=trayectoria['player_position_y'],
+                    mode='lines+markers',
+                    line=dict(color=COLORS['accent'], width=2),
+                    marker=dict(size=5, color=trayectoria['frame_idx'], colorscale='Viridis'),
+                    name=jugador_seleccionado
+                ))
+            
+            fig_trayectoria.add_hline(y=LARGO_CANCHA / 2, line=dict(color='white', width=2))
+            fig_trayectoria.update_layout(
+                template=PLANTILLA_OSCURA,
+                paper_bgcolor='rgba(0,0,0,0)',
+                plot_bgcolor='rgba(0,0,0,0)',
+                xaxis=dict(title="Ancho (m)", range=[0, ANCHO_CANCHA]),
+                yaxis=dict(title="Largo (m)", range=[0, LARGO_CANCHA], scaleanchor='x'),
+                legend=dict(x=0, y=1),
+                height=500
+            )
+            
+            return compactar_figura(fig_trayectoria, coordenadas=True)
+    
     @callback(
         Output('consejo-ia-texto', 'children'),
         [Input('btn-generar-consejo', 'n_clicks')],
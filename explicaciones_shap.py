@@ -0,0 +1,215 @@
+"""
+Explicaciones SHAP - Factores del estado físico predicho por partido
+====================================================================
+
+Calcula con TreeSHAP la contribución de cada variable a la predicción del
+modelo `pipe_estado` (XGBoost) para todos los partidos y las guarda en disco:
+
+- valores.npy    : matriz float32 (n_partidos × n_variables) con los valores
+                   SHAP de la clase predicha, alineada con las variables de
+                   salida del ColumnTransformer (get_feature_names_out).
+- filas.csv      : jugador, partido_num, huella de la fila y clase predicha.
+- metadatos.json : nombres de variables, clases, valores base y huella del modelo.
+
+Solo se recalculan las filas nuevas o cuyas variables cambiaron (mismo modelo).
+El cálculo se hace en lotes vectorizados repartidos entre los núcleos.
+
+Generar desde el notebook (después de entrenar pipe_estado):
+    from explicaciones_shap import calcular_explicaciones_shap
+    calcular_explicaciones_shap(pipe_estado, matches, feature_cols, le_estado.classes_)
+"""
+
+import os
+import re
+import json
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+import joblib
+from joblib import Parallel, delayed
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+DIRECTORIO_SHAP = "explicaciones_shap"
+
+# Filas por lote enviado a cada proceso
+TAM_LOTE_SHAP = 512
+
+# Número de factores mostrados en el dashboard
+N_FACTORES = 8
+
+
+def extraer_numero_partido(x):
+    """Convierte 'Partido 27' o 27 en el entero 27 (igual que en el notebook)."""
+    if isinstance(x, str):
+        nums = re.findall(r'\d+', x)
+        if nums:
+            return int(nums[0])
+    return int(x)
+
+# =============================================================================
+# CÁLCULO
+# =============================================================================
+
+def _shap_lote(modelo, X_lote):
+    """
+    Valores TreeSHAP de un lote: (arreglo filas × variables × clases, valores base).
+
+    Los valores base se leen después de shap_values: con XGBoost, un explainer
+    recién creado devuelve base_score repetido en lugar del valor por clase.
+    """
+    import shap
+
+    explainer = shap.TreeExplainer(modelo)
+    valores = explainer.shap_values(X_lote)
+    if isinstance(valores, list):  # versiones de shap anteriores a 0.45
+        valores = np.stack(valores, axis=-1)
+    return valores.astype(np.float32), np.atleast_1d(explainer.expected_value).astype(float)
+
+
+def _leer_existentes(directorio):
+    """Carga el almacén previo (si existe) para reutilizar filas sin cambios."""
+    if not os.path.exists(os.path.join(directorio, "metadatos.json")):
+        return None
+
+    with open(os.path.join(directorio, "metadatos.json"), encoding="utf-8") as f:
+        metadatos = json.load(f)
+    filas = pd.read_csv(os.path.join(directorio, "filas.csv"), encoding="utf-8-sig",
+                        dtype={"huella": str})
+    valores = np.load(os.path.join(directorio, "valores.npy"))
+    return metadatos, filas, valores
+
+
+def calcular_explicaciones_shap(pipe_estado, matches, feature_cols, clases,
+                                directorio=DIRECTORIO_SHAP, n_jobs=-1,
+                                tam_lote=TAM_LOTE_SHAP):
+    """
+    Calcula y guarda los valores TreeSHAP de todos los partidos de `matches`.
+
+    Las filas cuyo (jugador, partido) y variables no cambiaron desde la última
+    ejecución se copian del almacén previo; si el modelo cambió se recalcula todo.
+
+    Devuelve el DataFrame de filas guardado.
+    """
+    preprocesador = pipe_estado.named_steps["preprocess"]
+    modelo = pipe_estado.named_steps["model"]
+    caracteristicas = [str(c) for c in preprocesador.get_feature_names_out()]
+    huella_modelo = joblib.hash(pipe_estado)
+
+    filas = pd.DataFrame({
+        "player_name_clean": matches["player_name_clean"].to_numpy(),
+        "partido_num": matches["partido"].map(extraer_numero_partido).to_numpy(),
+        "huella": pd.util.hash_pandas_object(matches[feature_cols], index=False)
+                    .astype(str).to_numpy(),
+    })
+
+    # Reutilizar filas del almacén previo con la misma huella y el mismo modelo
+    valores = np.full((len(filas), len(caracteristicas)), np.nan, dtype=np.float32)
+    clase_predicha = np.full(len(filas), -1, dtype=np.int64)
+    existentes = _leer_existentes(directorio)
+    if existentes is not None:
+        metadatos_prev, filas_prev, valores_prev = existentes
+        if (metadatos_prev["huella_modelo"] == huella_modelo
+                and metadatos_prev["caracteristicas"] == caracteristicas):
+            posicion_prev = pd.Series(np.arange(len(filas_prev)),
+                                      index=pd.MultiIndex.from_frame(
+                                          filas_prev[["player_name_clean", "partido_num", "huella"]]))
+            posicion_prev = posicion_prev[~posicion_prev.index.duplicated()]
+            claves = pd.MultiIndex.from_frame(filas[["player_name_clean", "partido_num", "huella"]])
+            encontradas = posicion_prev.reindex(claves).to_numpy()
+            reutilizar = ~np.isnan(encontradas)
+            origen = encontradas[reutilizar].astype(int)
+            valores[reutilizar] = valores_prev[origen]
+            clase_predicha[reutilizar] = filas_prev["clase_predicha"].to_numpy()[origen]
+
+    valores_base = None
+    if existentes is not None and np.any(clase_predicha >= 0):
+        valores_base = np.asarray(metadatos_prev["valores_base"], dtype=float)
+
+    pendientes = np.flatnonzero(clase_predicha < 0)
+    print(f"🔍 SHAP: {len(filas) - len(pendientes)} filas reutilizadas | "
+          f"{len(pendientes)} filas por calcular")
+
+    if len(pendientes) > 0:
+        X = preprocesador.transform(matches.iloc[pendientes][feature_cols])
+        if hasattr(X, "toarray"):
+            X = X.toarray()
+        X = np.asarray(X, dtype=np.float32)
+
+        # Lotes en paralelo; cada proceso usa TreeSHAP vectorizado sobre su lote
+        lotes = [X[i:i + tam_lote] for i in range(0, len(X), tam_lote)]
+        resultados = Parallel(n_jobs=n_jobs)(delayed(_shap_lote)(modelo, lote) for lote in lotes)
+        shap_pendientes = np.concatenate([lote for lote, _ in resultados], axis=0)
+        valores_base = resultados[0][1]
+
+        # Se guarda solo la contribución hacia la clase predicha
+        prediccion = modelo.predict(X).astype(np.int64)
+        valores[pendientes] = shap_pendientes[np.arange(len(pendientes)), :, prediccion]
+        clase_predicha[pendientes] = prediccion
+
+    filas["clase_predicha"] = clase_predicha
+
+    os.makedirs(directorio, exist_ok=True)
+    np.save(os.path.join(directorio, "valores.npy"), valores)
+    filas.to_csv(os.path.join(directorio, "filas.csv"), index=False, encoding="utf-8-sig")
+    with open(os.path.join(directorio, "metadatos.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "caracteristicas": caracteristicas,
+            "clases": [str(c) for c in clases],
+            "valores_base": [] if valores_base is None else valores_base.tolist(),
+            "huella_modelo": huella_modelo,
+        }, f, ensure_ascii=False, indent=1)
+
+    print(f"✅ Explicaciones SHAP guardadas en '{directorio}' "
+          f"({valores.shape[0]} × {valores.shape[1]}, float32)")
+    return filas
+
+# =============================================================================
+# LECTURA DESDE EL DASHBOARD
+# =============================================================================
+
+def explicaciones_disponibles(directorio=DIRECTORIO_SHAP):
+    """Indica si el almacén de explicaciones SHAP fue generado."""
+    return os.path.exists(os.path.join(directorio, "metadatos.json"))
+
+
+@lru_cache(maxsize=1)
+def cargar_explicaciones(directorio=DIRECTORIO_SHAP):
+    """
+    Abre el almacén SHAP (memory-map) y construye el índice
+    {(jugador, partido_num): fila} para búsquedas O(1).
+    """
+    with open(os.path.join(directorio, "metadatos.json"), encoding="utf-8") as f:
+        metadatos = json.load(f)
+    filas = pd.read_csv(os.path.join(directorio, "filas.csv"), encoding="utf-8-sig",
+                        dtype={"huella": str})
+
+    return {
+        "valores": np.load(os.path.join(directorio, "valores.npy"), mmap_mode="r"),
+        "caracteristicas": np.array(metadatos["caracteristicas"]),
+        "clases": metadatos["clases"],
+        "clase_predicha": filas["clase_predicha"].to_numpy(),
+        "indice": dict(zip(zip(filas["player_name_clean"], filas["partido_num"]),
+                           range(len(filas)))),
+    }
+
+
+def factores_principales(jugador, partido_num, n=N_FACTORES, directorio=DIRECTORIO_SHAP):
+    """
+    Devuelve (clase_predicha, DataFrame con las `n` variables de mayor |SHAP|)
+    para un jugador en un partido, o (None, DataFrame vacío) si no hay datos.
+    """
+    explicaciones = cargar_explicaciones(directorio)
+    fila = explicaciones["indice"].get((jugador, int(partido_num)))
+    if fila is None:
+        return None, pd.DataFrame(columns=["variable", "shap"])
+
+    valores = np.asarray(explicaciones["valores"][fila])
+    orden = np.argsort(-np.abs(valores))[:n]
+    clase = explicaciones["clases"][explicaciones["clase_predicha"][fila]]
+    return clase, pd.DataFrame({
+        "variable": explicaciones["caracteristicas"][orden],
+        "shap": valores[orden],
+    })
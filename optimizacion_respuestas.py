@@ -0,0 +1,252 @@
+"""
+Optimización de Respuestas - Serialización compacta de figuras del dashboard
+============================================================================
+
+Los callbacks del dashboard devuelven figuras de Plotly completas en JSON. Este
+módulo reduce el tamaño de esas respuestas:
+
+- Usa orjson como motor JSON de Plotly (mucho más rápido que json estándar).
+- Convierte los arreglos numéricos a float32, que Plotly (>= 6) envía como
+  typed arrays en base64 ({"dtype": "f4", "bdata": ...}), y redondea las
+  coordenadas (UMAP, posiciones en la cancha) a una precisión configurable.
+- Reemplaza la plantilla 'plotly_dark' completa por una versión reducida con
+  solo los tipos de traza que usa el dashboard.
+- Activa compresión brotli/gzip sobre el servidor Flask (app.server).
+
+Medir el tamaño de las respuestas: python optimizacion_respuestas.py
+"""
+
+import os
+import gzip
+import numpy as np
+import plotly.io as pio
+import plotly.graph_objects as go
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+# Decimales conservados en las coordenadas (UMAP, posiciones en la cancha)
+DECIMALES_COORDENADAS = int(os.getenv("DECIMALES_COORDENADAS", "3"))
+
+# Algoritmos de compresión en orden de preferencia (según Accept-Encoding)
+ALGORITMOS_COMPRESION = ["br", "gzip"]
+
+# Nivel de brotli: desde 5 supera a gzip en los typed arrays sin penalizar latencia
+NIVEL_BROTLI = 5
+
+# Tipos de traza que usa el dashboard (el resto se elimina de la plantilla)
+TRAZAS_DASHBOARD = ["scatter", "bar", "scatterpolar", "pie", "heatmap"]
+
+# Atributos de cada traza que pueden contener arreglos numéricos grandes
+CAMPOS_NUMERICOS = ["x", "y", "r", "values", "z", "marker.color", "marker.size"]
+
+# Atributos redondeados a DECIMALES_COORDENADAS en las figuras de coordenadas
+CAMPOS_COORDENADAS = ["x", "y"]
+
+
+def crear_plantilla_compacta(nombre="plotly_dark", trazas=TRAZAS_DASHBOARD):
+    """
+    Crea una copia de la plantilla de Plotly conservando el layout completo y
+    solo los estilos por defecto de los tipos de traza indicados.
+    """
+    plantilla = pio.templates[nombre]
+    datos = {
+        tipo: plantilla.data[tipo]
+        for tipo in trazas
+        if plantilla.data[tipo]
+    }
+    return go.layout.Template(layout=plantilla.layout, data=datos)
+
+
+PLANTILLA_OSCURA = crear_plantilla_compacta("plotly_dark")
+
+# =============================================================================
+# SERIALIZACIÓN COMPACTA
+# =============================================================================
+
+def configurar_serializacion():
+    """Usa orjson como motor JSON de Plotly/Dash si está instalado."""
+    try:
+        import orjson  # noqa: F401
+        pio.json.config.default_engine = "orjson"
+    except ImportError:
+        print("⚠️ orjson no instalado. Se usa el serializador JSON estándar.")
+
+
+def compactar_arreglo(valores, decimales=None):
+    """
+    Convierte un arreglo de punto flotante a float32, redondeado a `decimales`
+    si se indica.
+
+    Los arreglos que no son numéricos de punto flotante se devuelven sin cambios
+    (los enteros ya se envían con el tipo más pequeño posible).
+    """
+    if not isinstance(valores, np.ndarray) or valores.dtype.kind != 'f':
+        return valores
+
+    if decimales is not None:
+        valores = np.round(valores, decimales)
+    return valores.astype(np.float32)
+
+
+def compactar_figura(fig, coordenadas=False, decimales=DECIMALES_COORDENADAS):
+    """
+    Reduce los arreglos numéricos de todas las trazas de la figura a float32.
+    Si `coordenadas` es True (UMAP, cancha), además redondea x/y a `decimales`;
+    las métricas se envían sin redondear. Modifica la figura y la devuelve.
+
+    En float32 base64 cada valor ocupa 4 bytes con cualquier precisión: el
+    redondeo no reduce la respuesta sin comprimir, solo mejora la compresión.
+    """
+    for traza in fig.data:
+        for campo in CAMPOS_NUMERICOS:
+            try:
+                valores = traza[campo]
+            except (KeyError, ValueError):
+                continue
+            redondeo = decimales if coordenadas and campo in CAMPOS_COORDENADAS else None
+            compactado = compactar_arreglo(valores, redondeo)
+            if compactado is not valores:
+                traza[campo] = compactado
+    return fig
+
+# =============================================================================
+# COMPRESIÓN HTTP
+# =============================================================================
+
+def configurar_compresion(server, algoritmos=ALGORITMOS_COMPRESION):
+    """
+    Activa compresión de respuestas (brotli/gzip) en el servidor Flask de Dash.
+
+    Se configura directamente con flask_compress en lugar de `Dash(compress=True)`
+    para poder elegir los algoritmos antes de registrar la extensión.
+    """
+    try:
+        from flask_compress import Compress
+    except ImportError:
+        print("⚠️ flask-compress no instalado. Respuestas sin comprimir.")
+        return False
+
+    server.config["COMPRESS_ALGORITHM"] = algoritmos
+    server.config["COMPRESS_BR_LEVEL"] = NIVEL_BROTLI
+    server.config["COMPRESS_MIMETYPES"] = ["application/json", "text/html",
+                                          "text/css", "application/javascript"]
+    Compress(server)
+    return True
+
+# =============================================================================
+# MEDICIÓN DE BYTES POR CALLBACK
+# =============================================================================
+
+def generar_datos_sinteticos(n_jugadores=2000, partidos_por_jugador=25, semilla=42):
+    """Genera un dataset con las columnas de 'datos_dashboard.csv' para pruebas de carga."""
+    import pandas as pd
+
+    rng = np.random.default_rng(semilla)
+    n = n_jugadores * partidos_por_jugador
+    niveles = np.array(["Alto rendimiento", "Bajo rendimiento", "Rendimiento medio"])
+    estados = np.array(["Malo", "Regular", "Bueno", "Excelente"])
+    evaluaciones = np.array(["Declaró correctamente", "Sobreestimó", "Subestimó"])
+
+    cluster = rng.integers(0, 3, n)
+    partido = np.tile(np.arange(1, partidos_por_jugador + 1), n_jugadores)
+    return pd.DataFrame({
+        'player_name_clean': np.repeat([f"JUGADOR {i:05d}" for i in range(n_jugadores)],
+                                       partidos_por_jugador),
+        'partido': partido.astype(str),
+        'player_speed_mps_mean': rng.gamma(4, 0.25, n),
+        'player_speed_mps_std': rng.gamma(3, 0.2, n),
+        'player_acceleration_mps2_mean': rng.normal(0, 0.05, n),
+        'player_displacement_m_sum': rng.gamma(5, 1.2, n),
+        'distance_player_to_ball_m_mean': rng.gamma(6, 0.9, n),
+        'EDAD_first': rng.integers(18, 60, n),
+        'ESTATURA_first': rng.integers(150, 195, n),
+        'NIVEL_ACTUAL_PADEL_first': "Intermedio",
+        'FRECUENCIA_DEPORTE_first': "3-4 veces",
+        'ESTADO_FISICO_first': rng.choice(estados, n),
+        'UMAP1': rng.normal(0, 8, n),
+        'UMAP2': rng.normal(0, 8, n),
+        'cluster_umap': cluster,
+        'nivel_rendimiento': niveles[cluster],
+        'partido_num': partido,
+        'nivel_num': cluster,
+        'evaluacion': rng.choice(evaluaciones, n),
+        'recomendacion': "Sin recomendación",
+    })
+
+
+def medir_bytes_callback(n_jugadores=2000, partidos_por_jugador=25):
+    """
+    Ejecuta el callback principal del dashboard sobre un dataset sintético y
+    devuelve los bytes de la respuesta antes y después de la optimización.
+
+    "Antes" son las figuras sin compactar con Plotly >= 6, que ya envía los
+    arreglos como typed arrays float64 en base64 (no como texto JSON).
+    """
+    import tempfile
+
+    directorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        generar_datos_sinteticos(n_jugadores, partidos_por_jugador).to_csv(
+            os.path.join(tmp, "datos_dashboard.csv"), index=False, encoding="utf-8-sig")
+        os.chdir(tmp)
+        try:
+            import dashboard
+        finally:
+            os.chdir(directorio_original)
+
+    cliente = dashboard.app.server.test_client()
+    cliente.get("/")  # registra los callbacks en app.callback_map
+
+    # Salidas del callback principal tal como están registradas en Dash
+    salida = next(clave for clave in dashboard.app.callback_map
+                  if clave.startswith("..resumen-general.children"))
+    salidas = salida.strip(".").split("...")
+    cuerpo = {
+        "output": salida,
+        "outputs": [{"id": s.split(".")[0], "property": s.split(".")[1]} for s in salidas],
+        "inputs": [{"id": "selector-jugador", "property": "value",
+                    "value": dashboard.jugadores_lista[0]}],
+        "changedPropIds": ["selector-jugador.value"],
+    }
+
+    def peticion(codificacion):
+        respuesta = cliente.post("/_dash-update-component", json=cuerpo,
+                                 headers={"Accept-Encoding": codificacion})
+        if respuesta.status_code != 200:
+            raise RuntimeError(f"El callback respondió con estado {respuesta.status_code}")
+        return respuesta.get_data()
+
+    # Antes: plantilla completa, float64 en base64 y sin compresión
+    compactar, plantilla = dashboard.compactar_figura, dashboard.PLANTILLA_OSCURA
+    dashboard.compactar_figura = lambda fig, **kwargs: fig
+    dashboard.PLANTILLA_OSCURA = "plotly_dark"
+    pio.json.config.default_engine = "json"
+    antes = peticion("identity")
+    dashboard.compactar_figura, dashboard.PLANTILLA_OSCURA = compactar, plantilla
+    configurar_serializacion()
+
+    # Después: figuras compactas y compresión negociada con el cliente
+    compacto = peticion("identity")
+    return {
+        "registros": n_jugadores * partidos_por_jugador,
+        "antes": len(antes),
+        "antes_gzip": len(gzip.compress(antes)),
+        "compacto": len(compacto),
+        "compacto_gzip": len(peticion("gzip")),
+        "compacto_br": len(peticion("br")),
+    }
+
+
+if __name__ == '__main__':
+    resultados = medir_bytes_callback()
+    print("\n" + "="*60)
+    print(f"📦 BYTES POR CALLBACK ({resultados['registros']:,} registros sintéticos)")
+    print("="*60)
+    print(f"   Antes (base64 float64 + plantilla completa): {resultados['antes']:>10,} B")
+    print(f"   Antes con gzip (referencia):               {resultados['antes_gzip']:>12,} B")
+    print(f"   Figuras compactas (float32, sin comprimir): {resultados['compacto']:>11,} B")
+    print(f"   Figuras compactas + gzip:                  {resultados['compacto_gzip']:>12,} B")
+    print(f"   Figuras compactas + brotli:                {resultados['compacto_br']:>12,} B")
+    print(f"   Reducción total: {resultados['antes'] / resultados['compacto_br']:.1f}x")
@@ -0,0 +1,246 @@
+"""
+Pronósticos de Rendimiento - Tendencia por jugador para los próximos partidos
+=============================================================================
+
+Pronostica métricas continuas de rendimiento de cada jugador para sus próximos
+N partidos:
+
+- player_speed_mps_mean     : velocidad media (m/s)
+- player_displacement_m_sum : desplazamiento total (m)
+- distancia_cluster_alto    : distancia en UMAP al centroide del clúster de
+                              alto rendimiento (menor es mejor)
+
+En lugar de un ajuste de Prophet por jugador, se ajusta una tendencia lineal
+(mínimos cuadrados sobre el orden de los partidos) para TODOS los jugadores y
+métricas a la vez con sumas agrupadas de numpy/pandas. Con pocos partidos por
+jugador esta tendencia es igual de informativa y cuesta milisegundos. Los
+jugadores se reparten en lotes entre núcleos con joblib.
+
+Los resultados se guardan en 'pronosticos/' y solo se recalculan los jugadores
+cuya serie cambió (partidos nuevos o métricas modificadas).
+"""
+
+import os
+import json
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+DIRECTORIO_PRONOSTICOS = "pronosticos"
+
+METRICAS_PRONOSTICO = {
+    'player_speed_mps_mean': "Velocidad media (m/s)",
+    'player_displacement_m_sum': "Desplazamiento total (m)",
+    'distancia_cluster_alto': "Distancia al clúster de alto rendimiento",
+}
+
+# Partidos a pronosticar y nivel del intervalo de predicción
+HORIZONTE_PRONOSTICO = 3
+NIVEL_INTERVALO = 0.8
+
+# Jugadores por lote enviado a cada núcleo
+TAM_LOTE_JUGADORES = 2000
+
+# =============================================================================
+# PREPARACIÓN DE SERIES
+# =============================================================================
+
+def calcular_distancia_cluster(matches):
+    """Distancia de cada partido (UMAP1, UMAP2) al centroide de alto rendimiento."""
+    alto = matches['nivel_rendimiento'] == "Alto rendimiento"
+    if not alto.any():
+        return pd.Series(np.nan, index=matches.index)
+
+    centroide = matches.loc[alto, ['UMAP1', 'UMAP2']].mean().to_numpy()
+    return pd.Series(np.linalg.norm(matches[['UMAP1', 'UMAP2']].to_numpy() - centroide, axis=1),
+                     index=matches.index)
+
+
+def preparar_series(matches):
+    """Series por jugador ordenadas por partido, con las métricas a pronosticar."""
+    series = matches[['player_name_clean', 'partido_num']
+                     + [m for m in METRICAS_PRONOSTICO if m in matches.columns]].copy()
+    if 'distancia_cluster_alto' not in series.columns:
+        series['distancia_cluster_alto'] = calcular_distancia_cluster(matches)
+    return series.sort_values(['player_name_clean', 'partido_num'], kind='mergesort') \
+                 .reset_index(drop=True)
+
+
+def huellas_jugadores(series):
+    """Huella (hash) de la serie de cada jugador para detectar partidos nuevos."""
+    hashes = pd.util.hash_pandas_object(series, index=False)
+    return hashes.groupby(series['player_name_clean']).sum().astype(str)
+
+# =============================================================================
+# AJUSTE VECTORIZADO
+# =============================================================================
+
+def _tiempos(series):
+    """Orden de partido t por fila y sus estadísticos por jugador (n, media, Sxx)."""
+    jugador = series['player_name_clean']
+    t = series.groupby(jugador).cumcount().astype(float)
+    grupos = t.groupby(jugador)
+    n = grupos.size().astype(float)
+    t_medio = grupos.mean()
+    sxx = ((t - t_medio.reindex(jugador).to_numpy()) ** 2).groupby(jugador).sum()
+    return jugador, t, n, t_medio, sxx
+
+
+def _ajustar_metrica(series, metrica, jugador, t, n, t_medio, sxx):
+    """Pendiente, intercepto y varianza residual (NaN con < 3 partidos) por jugador."""
+    y = series[metrica].astype(float)
+    y_medio = y.groupby(jugador).mean()
+    sxy = ((t - t_medio.reindex(jugador).to_numpy())
+           * (y - y_medio.reindex(jugador).to_numpy())).groupby(jugador).sum()
+    pendiente = (sxy / sxx).where(sxx > 0, 0.0)
+    intercepto = y_medio - pendiente * t_medio
+
+    ajuste = intercepto.reindex(jugador).to_numpy() + pendiente.reindex(jugador).to_numpy() * t
+    sse = ((y - ajuste) ** 2).groupby(jugador).sum()
+    varianza = (sse / (n - 2)).where(n > 2)
+    return pendiente, intercepto, varianza
+
+
+def varianza_agrupada(series):
+    """
+    Varianza residual de respaldo por métrica para jugadores con < 3 partidos:
+    mediana de la varianza residual de todos los jugadores de `series` (o la
+    varianza de la métrica si ninguno tiene 3 partidos).
+
+    Debe calcularse sobre la serie completa, no por lote ni solo sobre los
+    jugadores a recalcular, para que el resultado no dependa de cómo se reparte.
+    """
+    jugador, t, n, t_medio, sxx = _tiempos(series)
+    respaldo = {}
+    for metrica in METRICAS_PRONOSTICO:
+        _, _, varianza = _ajustar_metrica(series, metrica, jugador, t, n, t_medio, sxx)
+        valor = varianza.median()
+        if np.isnan(valor):
+            valor = series[metrica].astype(float).var()
+        respaldo[metrica] = float(valor)
+    return respaldo
+
+
+def ajustar_tendencias(series, horizonte=HORIZONTE_PRONOSTICO, nivel=NIVEL_INTERVALO,
+                       respaldo=None):
+    """
+    Ajusta y = a + b·t por jugador y métrica (t = orden del partido) con sumas
+    agrupadas, sin bucles por jugador, y pronostica los próximos `horizonte`
+    partidos con intervalo de predicción al `nivel` indicado.
+
+    `respaldo` es la varianza por métrica de los jugadores con < 3 partidos
+    (ver varianza_agrupada); si no se indica se calcula sobre `series`.
+    """
+    if respaldo is None:
+        respaldo = varianza_agrupada(series)
+
+    z = NormalDist().inv_cdf(0.5 + nivel / 2)
+    jugador, t, n, t_medio, sxx = _tiempos(series)
+
+    resultados = []
+    for metrica in METRICAS_PRONOSTICO:
+        pendiente, intercepto, varianza = _ajustar_metrica(series, metrica, jugador,
+                                                           t, n, t_medio, sxx)
+        varianza = varianza.fillna(respaldo[metrica])
+
+        for k in range(1, horizonte + 1):
+            t_futuro = n - 1 + k
+            # Las tres métricas son no negativas
+            pronostico = (intercepto + pendiente * t_futuro).clip(lower=0)
+            palanca = ((t_futuro - t_medio) ** 2 / sxx).where(sxx > 0, 0.0)
+            error = np.sqrt(varianza * (1 + 1 / n + palanca))
+            resultados.append(pd.DataFrame({
+                'player_name_clean': n.index,
+                'metrica': metrica,
+                'paso': k,
+                'pronostico': pronostico.to_numpy(),
+                'inferior': (pronostico - z * error).clip(lower=0).to_numpy(),
+                'superior': (pronostico + z * error).to_numpy(),
+            }))
+
+    return pd.concat(resultados, ignore_index=True)
+
+
+def pronosticar_jugadores(series, horizonte=HORIZONTE_PRONOSTICO, nivel=NIVEL_INTERVALO,
+                          n_jobs=-1, tam_lote=TAM_LOTE_JUGADORES, respaldo=None):
+    """
+    Ajusta las tendencias repartiendo los jugadores en lotes entre procesos
+    (las operaciones agrupadas de pandas retienen el GIL, por eso no hilos).
+    La varianza de respaldo se calcula una sola vez antes de repartir.
+    """
+    if respaldo is None:
+        respaldo = varianza_agrupada(series)
+
+    lote = series.groupby('player_name_clean', sort=False).ngroup() // tam_lote
+    if lote.max() == 0:
+        return ajustar_tendencias(series, horizonte, nivel, respaldo)
+
+    resultados = Parallel(n_jobs=n_jobs)(
+        delayed(ajustar_tendencias)(grupo, horizonte, nivel, respaldo)
+        for _, grupo in series.groupby(lote)
+    )
+    return pd.concat(resultados, ignore_index=True)
+
+# =============================================================================
+# CACHÉ EN DISCO
+# =============================================================================
+
+def actualizar_pronosticos(matches, horizonte=HORIZONTE_PRONOSTICO, nivel=NIVEL_INTERVALO,
+                           directorio=DIRECTORIO_PRONOSTICOS, n_jobs=-1):
+    """
+    Devuelve los pronósticos de todos los jugadores, reutilizando los guardados
+    en `directorio` y recalculando solo los jugadores con partidos nuevos o
+    modificados. Si cambia el horizonte o el nivel, se recalcula todo.
+    """
+    series = preparar_series(matches)
+    huellas = huellas_jugadores(series)
+    configuracion = {'horizonte': horizonte, 'nivel': nivel,
+                     'metricas': list(METRICAS_PRONOSTICO)}
+    # Varianza de respaldo sobre TODOS los jugadores, no solo los pendientes
+    respaldo = varianza_agrupada(series)
+
+    ruta_pronosticos = os.path.join(directorio, "pronosticos.csv")
+    ruta_huellas = os.path.join(directorio, "huellas.csv")
+    ruta_metadatos = os.path.join(directorio, "metadatos.json")
+
+    previos = pd.DataFrame()
+    pendientes = huellas.index
+    if os.path.exists(ruta_metadatos):
+        with open(ruta_metadatos, encoding="utf-8") as f:
+            metadatos = json.load(f)
+        respaldo_previo = metadatos.pop('varianza_respaldo', None)
+        if metadatos == configuracion:
+            huellas_previas = pd.read_csv(ruta_huellas, encoding="utf-8-sig", dtype={'huella': str}) \
+                                .set_index('player_name_clean')['huella']
+            sin_cambios = huellas.index[huellas.eq(huellas_previas.reindex(huellas.index))]
+            # Si cambió la varianza de respaldo, los jugadores con < 3 partidos
+            # guardados usan un valor obsoleto y también se recalculan
+            if respaldo_previo != respaldo:
+                partidos_por_jugador = series.groupby('player_name_clean').size()
+                sin_cambios = sin_cambios.difference(
+                    partidos_por_jugador.index[partidos_por_jugador < 3])
+            previos = pd.read_csv(ruta_pronosticos, encoding="utf-8-sig")
+            previos = previos[previos['player_name_clean'].isin(sin_cambios)]
+            pendientes = huellas.index.difference(sin_cambios)
+
+    print(f"📈 Pronósticos: {huellas.size - len(pendientes)} jugadores en caché | "
+          f"{len(pendientes)} por recalcular")
+
+    nuevos = pd.DataFrame()
+    if len(pendientes) > 0:
+        nuevos = pronosticar_jugadores(series[series['player_name_clean'].isin(pendientes)],
+                                       horizonte, nivel, n_jobs, respaldo=respaldo)
+    pronosticos = pd.concat([previos, nuevos], ignore_index=True)
+
+    os.makedirs(directorio, exist_ok=True)
+    pronosticos.to_csv(ruta_pronosticos, index=False, encoding="utf-8-sig")
+    huellas.rename('huella').to_csv(ruta_huellas, index_label='player_name_clean', encoding="utf-8-sig")
+    with open(ruta_metadatos, "w", encoding="utf-8") as f:
+        json.dump({**configuracion, 'varianza_respaldo': respaldo}, f, ensure_ascii=False, indent=1)
+
+    return pronosticos
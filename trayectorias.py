@@ -0,0 +1,188 @@
+"""
+Almacén de Trayectorias - Coordenadas por frame de cada jugador y punto
+=======================================================================
+
+El notebook elimina las coordenadas por frame (`cols_to_drop`) antes de agregar
+por partido. Este módulo las conserva en disco en un formato compacto:
+
+- coordenadas.npy : matriz float32 (n_frames × 6) con posición del jugador,
+                    posición de la pelota y posición previa del jugador.
+- frames.npy      : frame_idx (int32) de cada fila.
+- indice.csv      : (jugador, partido_num, punto) → filas [inicio, fin).
+
+Las filas se ordenan por jugador, partido, punto y frame, de modo que cada punto,
+cada partido y cada jugador ocupan un bloque contiguo. Los .npy se abren con
+memory-map: leer la trayectoria de un punto cuesta O(longitud del punto) sin
+cargar la tabla de videos completa.
+
+Generar el almacén desde el notebook (antes de `cols_to_drop`):
+    from trayectorias import construir_almacen_trayectorias
+    construir_almacen_trayectorias(df_merge_fixed)
+"""
+
+import os
+import re
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# CONFIGURACIÓN
+# =============================================================================
+
+DIRECTORIO_TRAYECTORIAS = "trayectorias"
+
+COLUMNAS_COORDENADAS = [
+    "player_position_x", "player_position_y",
+    "ball_position_x", "ball_position_y",
+    "prev_x", "prev_y",
+]
+
+CLAVES_INDICE = ["player_name_clean", "partido_num", "punto"]
+
+# Dimensiones de la cancha de pádel en metros (ancho × largo)
+ANCHO_CANCHA = 10.0
+LARGO_CANCHA = 20.0
+
+# Tamaño de celda del mapa de calor en metros
+RESOLUCION_MAPA_CALOR = 0.5
+
+
+def extraer_numero_partido(x):
+    """Convierte 'Partido 27' o 27 en el entero 27 (igual que en el notebook)."""
+    if isinstance(x, str):
+        nums = re.findall(r'\d+', x)
+        if nums:
+            return int(nums[0])
+    return int(x)
+
+# =============================================================================
+# CONSTRUCCIÓN DEL ALMACÉN
+# =============================================================================
+
+def construir_almacen_trayectorias(df_frames, directorio=DIRECTORIO_TRAYECTORIAS):
+    """
+    Guarda las coordenadas por frame de `df_frames` (tabla de videos antes de
+    eliminar `cols_to_drop`) en el almacén de trayectorias.
+
+    Devuelve el índice de puntos como DataFrame.
+    """
+    df = df_frames[["player_name_clean", "partido", "punto", "frame_idx"]
+                   + COLUMNAS_COORDENADAS].dropna(subset=["player_name_clean", "partido", "punto"])
+    df = df.assign(
+        partido_num=df["partido"].map(extraer_numero_partido),
+        punto=df["punto"].astype(int)
+    ).sort_values(CLAVES_INDICE + ["frame_idx"], kind="mergesort")
+
+    # Inicio de cada bloque (jugador, partido, punto): donde cambia alguna clave
+    claves = df[CLAVES_INDICE]
+    cambio = (claves != claves.shift()).any(axis=1).to_numpy()
+    inicios = np.flatnonzero(cambio)
+    fines = np.append(inicios[1:], len(df))
+
+    indice = claves.iloc[inicios].reset_index(drop=True)
+    indice["inicio"] = inicios
+    indice["fin"] = fines
+
+    os.makedirs(directorio, exist_ok=True)
+    np.save(os.path.join(directorio, "coordenadas.npy"),
+            df[COLUMNAS_COORDENADAS].to_numpy(dtype=np.float32))
+    np.save(os.path.join(directorio, "frames.npy"),
+            df["frame_idx"].to_numpy(dtype=np.int32))
+    indice.to_csv(os.path.join(directorio, "indice.csv"), index=False, encoding="utf-8-sig")
+
+    print(f"✅ Trayectorias guardadas en '{directorio}'")
+    print(f"📊 Frames: {len(df)} | Puntos: {len(indice)} | "
+          f"Tamaño: {len(df) * len(COLUMNAS_COORDENADAS) * 4 / 1e6:.1f} MB")
+    return indice
+
+# =============================================================================
+# LECTURA DEL ALMACÉN
+# =============================================================================
+
+def almacen_disponible(directorio=DIRECTORIO_TRAYECTORIAS):
+    """Indica si el almacén de trayectorias fue generado."""
+    return os.path.exists(os.path.join(directorio, "indice.csv"))
+
+
+@lru_cache(maxsize=1)
+def cargar_almacen(directorio=DIRECTORIO_TRAYECTORIAS):
+    """
+    Abre el almacén con memory-map y construye los índices de búsqueda.
+
+    Devuelve un diccionario con:
+    - coordenadas, frames: arreglos memory-mapped (no se cargan en RAM)
+    - puntos:   {(jugador, partido_num, punto): (inicio, fin)}
+    - partidos: {(jugador, partido_num): (inicio, fin)}
+    - jugadores: {jugador: (inicio, fin)}
+    - lista_puntos: {(jugador, partido_num): [puntos ordenados]}
+    """
+    indice = pd.read_csv(os.path.join(directorio, "indice.csv"), encoding="utf-8-sig")
+
+    def rangos(claves):
+        bloques = indice.groupby(claves, sort=False).agg(inicio=("inicio", "min"), fin=("fin", "max"))
+        return dict(zip(bloques.index, zip(bloques["inicio"], bloques["fin"])))
+
+    return {
+        "coordenadas": np.load(os.path.join(directorio, "coordenadas.npy"), mmap_mode="r"),
+        "frames": np.load(os.path.join(directorio, "frames.npy"), mmap_mode="r"),
+        "puntos": rangos(CLAVES_INDICE),
+        "partidos": rangos(["player_name_clean", "partido_num"]),
+        "jugadores": rangos("player_name_clean"),
+        "lista_puntos": {
+            clave: sorted(grupo.tolist())
+            for clave, grupo in indice.groupby(["player_name_clean", "partido_num"])["punto"]
+        },
+    }
+
+
+def listar_puntos(jugador, partido_num, directorio=DIRECTORIO_TRAYECTORIAS):
+    """Lista ordenada de los puntos disponibles de un jugador en un partido."""
+    almacen = cargar_almacen(directorio)
+    return almacen["lista_puntos"].get((jugador, int(partido_num)), [])
+
+
+def obtener_trayectoria(jugador, partido_num, punto, directorio=DIRECTORIO_TRAYECTORIAS):
+    """
+    Devuelve la trayectoria de un punto como DataFrame (frame_idx + coordenadas).
+    Solo se leen del disco las filas de ese punto.
+    """
+    almacen = cargar_almacen(directorio)
+    rango = almacen["puntos"].get((jugador, int(partido_num), int(punto)))
+    if rango is None:
+        return pd.DataFrame(columns=["frame_idx"] + COLUMNAS_COORDENADAS)
+
+    inicio, fin = rango
+    trayectoria = pd.DataFrame(np.asarray(almacen["coordenadas"][inicio:fin]),
+                               columns=COLUMNAS_COORDENADAS)
+    trayectoria.insert(0, "frame_idx", np.asarray(almacen["frames"][inicio:fin]))
+    return trayectoria
+
+
+@lru_cache(maxsize=256)
+def mapa_calor_cancha(jugador, partido_num=None, resolucion=RESOLUCION_MAPA_CALOR,
+                      directorio=DIRECTORIO_TRAYECTORIAS):
+    """
+    Histograma 2D de las posiciones del jugador en la cancha (todas sus
+    posiciones o solo las de un partido). El resultado queda en caché por
+    jugador/partido.
+
+    Devuelve (conteos, bordes_x, bordes_y) con conteos de forma (n_y, n_x).
+    """
+    almacen = cargar_almacen(directorio)
+    if partido_num is None:
+        rango = almacen["jugadores"].get(jugador)
+    else:
+        rango = almacen["partidos"].get((jugador, int(partido_num)))
+
+    bordes_x = np.arange(0, ANCHO_CANCHA + resolucion, resolucion)
+    bordes_y = np.arange(0, LARGO_CANCHA + resolucion, resolucion)
+    if rango is None:
+        return np.zeros((len(bordes_y) - 1, len(bordes_x) - 1)), bordes_x, bordes_y
+
+    inicio, fin = rango
+    posiciones = np.asarray(almacen["coordenadas"][inicio:fin, :2])
+    posiciones = posiciones[~np.isnan(posiciones).any(axis=1)]
+
+    conteos, _, _ = np.histogram2d(posiciones[:, 1], posiciones[:, 0], bins=[bordes_y, bordes_x])
+    return conteos, bordes_x, bordes_y